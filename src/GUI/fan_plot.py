@@ -1,5 +1,4 @@
 import logging
-from pathlib import Path
 from functools import lru_cache
 
 import dash
@@ -9,30 +8,20 @@ import pandas as pd
 import plotly.express as px
 
 from src.model.calculate_chip_temp import calculate_parameters
+from src.model.fan_catalog import read_fan_data
 
 
 logging.basicConfig(level=logging.DEBUG)
 
 
-def airflow_cfm_to_m3s(airflow_cfm):
-    return airflow_cfm * 0.00047194745
-
-
 def swap_keys_values(a):
     return dict((v, k) for k, v in a.items())
 
 
-# read in fan data TODO clean data better
-current_dir = Path(__file__).parent
-fan_data = pd.read_csv(
-    current_dir / "../../data/model/fan_specifications_rack_fans.csv", index_col=0
-)
-fan_data = fan_data.loc[fan_data.index.dropna()]
-airflow = pd.to_numeric(fan_data["Airflow (CFM)"], errors="coerce").dropna()
-airflow = airflow_cfm_to_m3s(airflow)
+# read in fan data
+fan_data = read_fan_data()
+airflow = fan_data["Airflow (m3/s)"]
 fans = airflow.index
-fan_data = fan_data.loc[fans]
-fan_data["Airflow (m3/s)"] = airflow
 
 
 # Define the Dash app
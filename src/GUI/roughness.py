@@ -1,18 +1,16 @@
 
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
 from dash import dcc
 from dash import html
 import dash
 #import dash_core_components as dcc
 #import dash_html_components as html
 
-def calculate_roughness(thickness):
-    x = np.linspace(0, 1, 100)
-    y = x * 0.5 + np.random.normal(0, 0.02, size=100)
-    f = interp1d(x, y, kind='cubic')
-    return f(thickness)
+from src.model.roughness import default_model as roughness_model
+
+# the curve does not depend on the slider, so evaluate it once
+x = np.linspace(0, 1, 100)
+y = roughness_model(x)
 
 app = dash.Dash(__name__)
 
@@ -35,8 +33,8 @@ app.layout = html.Div(children=[
                 {'x': [], 'y': [], 'type': 'line'}
             ],
             'layout': {
-                'xaxis': {'title': 'Thickness'},
-                'yaxis': {'title': 'Surface Roughness'},
+                'xaxis': {'title': 'Thickness (mm)'},
+                'yaxis': {'title': 'Surface Roughness (mm)'},
                 'margin': {'l': 40, 'b': 40, 't': 10, 'r': 10},
                 'height': 300
             }
@@ -49,17 +47,15 @@ app.layout = html.Div(children=[
     [dash.dependencies.Input('thickness-slider', 'value')]
 )
 def update_figure(thickness):
-    x = np.linspace(0, 1, 100)
-    y = calculate_roughness(x)
-    roughness = calculate_roughness(thickness)
+    roughness = roughness_model(thickness)
     return {
         'data': [
             {'x': x, 'y': y, 'type': 'line'},
             {'x': [thickness], 'y': [roughness], 'mode': 'markers', 'marker': {'size': 10}}
         ],
         'layout': {
-            'xaxis': {'title': 'Thickness'},
-            'yaxis': {'title': 'Surface Roughness'},
+            'xaxis': {'title': 'Thickness (mm)'},
+            'yaxis': {'title': 'Surface Roughness (mm)'},
             'margin': {'l': 40, 'b': 40, 't': 10, 'r': 10},
             'height': 300
         }
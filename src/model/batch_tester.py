@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.model.calculate_chip_temp import (
+    CANTERA_FLUIDS,
+    VECTORIZE_MIN_BATCH,
+    calculate_parameters,
+    calculate_parameters_batch,
+)
+
+# The vectorized batch duplicates the scalar iteration in `Segment`, so check that
+# both still agree on random designs. Run with `python -m src.model.batch_tester`.
+rng = np.random.default_rng(0)
+n = max(200, VECTORIZE_MIN_BATCH)
+for fluid_name in CANTERA_FLUIDS:
+    designs = [
+        (
+            rng.uniform(0.05, 1),  # w
+            rng.uniform(0.005, 0.05),  # h
+            1e-5,  # l_in
+            rng.uniform(0.05, 0.5),  # l_chip
+            1e-5,  # l_out
+            rng.uniform(280, 310),  # t_in
+            rng.uniform(0.005, 0.15),  # v_dot
+            rng.uniform(50, 1000),  # q
+            fluid_name,
+            rng.uniform(0.01, 1),  # thickness
+        )
+        for _ in range(n)
+    ]
+    scalar = np.array([calculate_parameters(*design) for design in designs])
+    batch = np.array(calculate_parameters_batch(designs))
+    diff = np.abs(scalar - batch).max()
+    print(f"{fluid_name}: max difference {diff:.2e} K over {n} designs")
+    assert diff < 1e-4, "scalar and batch paths disagree"
+print('Done!')
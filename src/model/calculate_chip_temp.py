@@ -3,6 +3,9 @@
 
 import argparse
 import logging
+import signal
+import sys
+from functools import lru_cache
 from pathlib import Path
 
 import cantera as ct
@@ -10,10 +13,67 @@ import numpy as np
 import pandas as pd
 
 from src.model.nist_janaf import get_fluid_properties_janaf
+from src.model.roughness import default_model as roughness_model
+
+
+# fluids whose properties come from Cantera, all others are looked up from JANAF
+CANTERA_FLUIDS = ("air",)
+
+
+@lru_cache(maxsize=None)
+def get_cantera_solution(fluid_name):
+    """Loads the Cantera phase for `fluid_name` once per process.
+
+    Building a `ct.Solution` parses the mechanism file and dominates the cost of a
+    solve, so the phase object is reused and only its state is updated.
+    """
+    return ct.Solution(f"{fluid_name}.yaml")
+
+
+@lru_cache(maxsize=None)
+def get_cantera_property_table(fluid_name, pressure=101_325, t_min=200, t_max=2000):
+    """Tabulates the properties returned by `Segment.__get_properties` on a 0.05 K
+    grid, once per process, with a Cantera `SolutionArray`.
+
+    Returns:
+        temps (np.ndarray): Temperature grid (K)
+        props (np.ndarray): Rows of cp, k, pr, nu_k and rho at each temperature
+    """
+    temps = np.linspace(t_min, t_max, int((t_max - t_min) / 0.05) + 1)
+    fluid = ct.SolutionArray(get_cantera_solution(fluid_name), len(temps))
+    fluid.TP = temps, pressure
+    cp = fluid.cp_mass
+    rho = fluid.density
+    k = fluid.thermal_conductivity
+    nu_k = fluid.viscosity / fluid.density
+    pr = (nu_k * cp) / k
+    return temps, np.array([cp, k, pr, nu_k, rho])
+
+
+def get_friction_factor(Re, rel_roughness):
+    """Darcy friction factor for turbulent flow only (Haaland). Works on scalars
+    and arrays."""
+    return (-1.8 * np.log10((rel_roughness / 3.7) ** 1.11 + 6.9 / Re)) ** -2
+
+
+def get_nusselt(Re, Pr, rel_roughness=0):
+    """Nusselt number of the duct. Works on scalars and arrays."""
+    # NOTE assumes turbulence begins at inlet
+    # the turbulent branch is only used from Re = 2300 up, so clamp it there to
+    # keep the powers real for zero or reversed flow
+    Re_turbulent = np.maximum(Re, 2300)
+    nusselt = 0.23 * Re_turbulent**0.8 * Pr**0.4
+    # roughness (Norris): Nu / Nu_smooth = (f / f_smooth)^n, valid up to f / f_smooth = 4
+    f_ratio = get_friction_factor(Re_turbulent, rel_roughness) / get_friction_factor(
+        Re_turbulent, 0
+    )
+    nusselt = nusselt * np.minimum(f_ratio, 4) ** (0.68 * Pr**0.215)
+    # laminar
+    return np.where(Re < 2300, 4.364, nusselt)
 
 
 class Segment:
-    def __init__(self, w, h, l, t_in, v_dot, q, fluid_name):
+    def __init__(self, w, h, l, t_in, v_dot, q, fluid_name, thickness=0):
         """Initializes the channel segment.
 
         Inputs:
@@ -24,6 +84,8 @@ class Segment:
             t_dot (float): Volume flow rate of inlet fluid(m^3/s)
             q (float): Heat applied to bottom wall (W)
             fluid_name (string): Name of fluid
+            thickness (float, optional): Thickness of the wall coating, which sets
+                the wall roughness through `src.model.roughness` (mm)
 
         Parameters:
             t_mid (float): Temperature in the middle of the segment (K)
@@ -38,6 +100,7 @@ class Segment:
         self.v_dot = v_dot
         self.q = q
         self.fluid_name = fluid_name
+        self.thickness = thickness
         # parameters
         self.t_guess = 0
         self.t_mid = 0
@@ -65,8 +128,8 @@ class Segment:
         """
         temp = self.t_guess
 
-        if self.fluid_name == "air":
-            fluid = ct.Solution(f"{self.fluid_name}.yaml")
+        if self.fluid_name in CANTERA_FLUIDS:
+            fluid = get_cantera_solution(self.fluid_name)
             fluid.TP = temp, pressure
             cp = fluid.cp_mass
             rho = fluid.density
@@ -97,15 +160,6 @@ class Segment:
         # NOTE assumes rectangular and constant across length
         return 2 * (self.w + self.h)
 
-    def __get_nusselt(self, Re, Pr):
-        # NOTE assumes turbulence begins at inlet
-        # laminar
-        if Re < 2300:
-            return 4.364
-        # turbulent
-        else:
-            return 0.23 * Re**0.8 * Pr**0.4
-
     def calculate_wall_temp(self):
         """Calculates the temperature of the bottom wall in a rectangular duct,
         where the bottom wall is producing a constant heat flux.
@@ -162,7 +216,8 @@ class Segment:
         reynolds = self.v_dot * diameter_h / (area * nu_k)
 
         # estimate Nusselt number
-        nusselt = self.__get_nusselt(reynolds, prandtl)
+        rel_roughness = roughness_model.relative_roughness(self.thickness, diameter_h)
+        nusselt = float(get_nusselt(reynolds, prandtl, rel_roughness))
 
         # calculate heat coefficient
         h_coeff = nusselt * k / diameter_h
@@ -173,7 +228,9 @@ class Segment:
         logging.debug(f"Wall temperature: {self.t_wall:0.2f} K")
 
 
-def calculate_parameters(w, h, l_in, l_chip, l_out, t_in, v_dot, q, fluid_name):
+def calculate_parameters(
+    w, h, l_in, l_chip, l_out, t_in, v_dot, q, fluid_name, thickness=0
+):
     """Creates and combines the segments of the channel to calculate all
     important parameters.
 
@@ -187,6 +244,7 @@ def calculate_parameters(w, h, l_in, l_chip, l_out, t_in, v_dot, q, fluid_name):
         t_dot (float): Volume flow rate of inlet fluid(m^3/s)
         q (float): Heat applied to bottom wall of chip segment (W)
         fluid_name (string): Name of fluid
+        thickness (float, optional): Thickness of the wall coating (mm)
 
     Parameters:
         t_chip (float): Temperature of heated surface (K)
@@ -195,17 +253,17 @@ def calculate_parameters(w, h, l_in, l_chip, l_out, t_in, v_dot, q, fluid_name):
     """
     # inlet segment
     q_in = 0.10 * q * l_in / (l_in + l_out)
-    inlet = Segment(w, h, l_in, t_in, v_dot, q_in, fluid_name)
+    inlet = Segment(w, h, l_in, t_in, v_dot, q_in, fluid_name, thickness)
     inlet.calculate_wall_temp()
 
     # chip segment
     q_chip = 0.90 * q
-    chip = Segment(w, h, l_chip, inlet.t_out, v_dot, q_chip, fluid_name)
+    chip = Segment(w, h, l_chip, inlet.t_out, v_dot, q_chip, fluid_name, thickness)
     chip.calculate_wall_temp()
 
     # outlet segment
     q_out = 0.10 * q * l_out / (l_in + l_out)
-    outlet = Segment(w, h, l_out, chip.t_out, v_dot, q_out, fluid_name)
+    outlet = Segment(w, h, l_out, chip.t_out, v_dot, q_out, fluid_name, thickness)
     outlet.calculate_wall_temp()
 
     # summary
@@ -216,6 +274,196 @@ def calculate_parameters(w, h, l_in, l_chip, l_out, t_in, v_dot, q, fluid_name):
     return t_chip, t_mid_chip, t_out
 
 
+def calculate_wall_temp_batch(w, h, l, t_in, v_dot, q, thickness, fluid_name):
+    """Vectorized `Segment.calculate_wall_temp` for Cantera fluids.
+
+    Runs the same fixed-point iteration as `Segment` on arrays of segments, with
+    properties interpolated from `get_cantera_property_table`. Segments that have
+    converged are dropped from the working arrays.
+
+    Inputs:
+        w, h, l, t_in, v_dot, q, thickness (np.ndarray): See `Segment`
+        fluid_name (string): Name of fluid
+
+    Returns:
+        t_mid (np.ndarray): Temperature in the middle of the segments (K)
+        t_out (np.ndarray): Temperature exiting the segments (K)
+        t_wall (np.ndarray): Temperature of heated surfaces (K)
+        valid (np.ndarray): False where the iteration diverged or left the table
+    """
+    temps, table = get_cantera_property_table(fluid_name)
+    t_step = temps[1] - temps[0]
+    # the energy balance only needs rho * cp
+    rho_cp = table[4] * table[0]
+    rho_cp_slope = np.append(np.diff(rho_cp), 0)  # NOTE zero past the last point
+
+    area = w * h
+    perimeter = 2 * (w + h)
+    diameter_h = 4 * area / perimeter
+
+    # results, written back as segments converge
+    t_mid = np.full_like(t_in, np.nan)
+    t_out = np.full_like(t_in, np.nan)
+    t_final = np.full_like(t_in, np.nan)
+    valid = np.zeros(len(t_in), dtype=bool)
+
+    # working arrays of the segments still iterating
+    tol = 0.01
+    idx = np.arange(len(t_in))
+    dt = np.zeros_like(t_in)
+    t_guess = t_in.copy()
+    err_old = np.full_like(t_in, 10**7)
+    err_new = np.full_like(t_in, 10**6)
+    ti, vv, qq = t_in, v_dot, q
+
+    while idx.size:
+        # same steps as `Segment`: 0.01 below err 10, 1 above err 1000
+        step = np.clip(err_new * 0.001, 0.01, 1)
+        dt = np.where(err_new >= err_old, -0.01, np.copysign(step, dt))
+        t_guess = t_guess + dt
+
+        # linear interpolation on the uniform temperature grid
+        pos = (t_guess - temps[0]) / t_step
+        clipped = np.clip(pos, 0, len(temps) - 1)
+        on_table = clipped == pos
+        i0 = np.where(on_table, clipped, 0).astype(int)
+        rc = rho_cp[i0] + rho_cp_slope[i0] * (pos - i0)
+
+        t_o = qq / (rc * vv) + ti
+        t_m = (ti + t_o) / 2
+
+        err_old = err_new
+        err_new = (t_guess - t_m) ** 2
+
+        finite = np.isfinite(err_new)
+        running = (err_new > tol) & on_table & finite
+        if not running.all():
+            done = ~running
+            converged = done & on_table & finite
+            t_mid[idx[done]] = t_m[done]
+            t_out[idx[done]] = t_o[done]
+            t_final[idx[done]] = t_guess[done]
+            valid[idx[done]] = converged[done]
+
+            idx, dt, t_guess, err_old, err_new = (
+                a[running] for a in (idx, dt, t_guess, err_old, err_new)
+            )
+            ti, vv, qq = ti[running], vv[running], qq[running]
+
+    _, k, prandtl, nu_k, _ = [np.interp(t_final, temps, p) for p in table]
+
+    reynolds = v_dot * diameter_h / (area * nu_k)
+    rel_roughness = roughness_model.relative_roughness(thickness, diameter_h)
+    nusselt = get_nusselt(reynolds, prandtl, rel_roughness)
+    h_coeff = nusselt * k / diameter_h
+    t_wall = q / (h_coeff * w * l) + t_mid
+
+    valid &= np.isfinite(t_wall)
+    return t_mid, t_out, t_wall, valid
+
+
+# below this many designs, numpy's per-call overhead outweighs the vectorization
+VECTORIZE_MIN_BATCH = 48
+
+
+def _solve_vectorized(designs, fluid_name):
+    """Solves designs of one Cantera fluid with `calculate_wall_temp_batch`.
+
+    Returns:
+        solved (dict): design -> `(t_chip, t_mid_chip, t_out)` for the designs the
+            vectorized solve could handle
+    """
+    w, h, l_in, l_chip, l_out, t_in, v_dot, q = np.array(
+        [design[:8] for design in designs], dtype=float
+    ).T
+    thickness = np.array(
+        [design[9] if len(design) > 9 else 0 for design in designs], dtype=float
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # inlet segment
+        q_in = 0.10 * q * l_in / (l_in + l_out)
+        _, inlet_t_out, _, inlet_valid = calculate_wall_temp_batch(
+            w, h, l_in, t_in, v_dot, q_in, thickness, fluid_name
+        )
+
+        # chip segment
+        q_chip = 0.90 * q
+        t_mid_chip, chip_t_out, t_chip, chip_valid = calculate_wall_temp_batch(
+            w, h, l_chip, inlet_t_out, v_dot, q_chip, thickness, fluid_name
+        )
+
+        # outlet segment
+        q_out = 0.10 * q * l_out / (l_in + l_out)
+        _, t_out, _, outlet_valid = calculate_wall_temp_batch(
+            w, h, l_out, chip_t_out, v_dot, q_out, thickness, fluid_name
+        )
+
+    valid = inlet_valid & chip_valid & outlet_valid
+    return {
+        design: (float(t_chip[i]), float(t_mid_chip[i]), float(t_out[i]))
+        for i, design in enumerate(designs)
+        if valid[i]
+    }
+
+
+def calculate_parameters_batch(designs):
+    """Solves many channel designs in one call.
+
+    Identical designs are solved once. When a Cantera fluid has at least
+    `VECTORIZE_MIN_BATCH` designs, they are solved together with
+    `calculate_wall_temp_batch`, one vectorized call per channel segment. Other
+    fluids, small batches, and designs the vectorized solve cannot handle (e.g.
+    zero flow rate) use `calculate_parameters`.
+
+    Inputs:
+        designs (list): Tuples of `calculate_parameters` arguments, in order
+
+    Returns:
+        results (list): `(t_chip, t_mid_chip, t_out)` for each design, in input
+            order, or the exception `calculate_parameters` raised for that design
+    """
+    unique = list(dict.fromkeys(designs))
+    solved = {}
+
+    for fluid_name in CANTERA_FLUIDS:
+        batch = [design for design in unique if design[8] == fluid_name]
+        if len(batch) >= VECTORIZE_MIN_BATCH:
+            solved.update(_solve_vectorized(batch, fluid_name))
+
+    for design in unique:
+        if design not in solved:
+            try:
+                solved[design] = calculate_parameters(*design)
+            except Exception as e:
+                solved[design] = e
+    return [solved[design] for design in designs]
+
+
+# JSON keys of a design, in `calculate_parameters` argument order. The coating
+# "thickness" (mm) is optional and defaults to an uncoated, smooth channel.
+DESIGN_KEYS = ("w", "h", "l_in", "l_chip", "l_out", "t_in", "v_dot", "q", "fluid_name")
+
+
+def parse_design(data):
+    """Converts a JSON object into a `calculate_parameters` argument tuple."""
+    missing = [key for key in DESIGN_KEYS if key not in data]
+    if missing:
+        raise ValueError(f"Missing keys: {missing}")
+    design = tuple(float(data[key]) for key in DESIGN_KEYS[:-1]) + (
+        str(data["fluid_name"]),
+        float(data.get("thickness", 0)),
+    )
+    w, h, l_in, l_chip, l_out, t_in, v_dot, q, fluid_name, thickness = design
+    # the correlations and the energy balance only hold for a real, forward flow
+    for key, value in (("w", w), ("h", h), ("l_chip", l_chip), ("v_dot", v_dot)):
+        if not value > 0:
+            raise ValueError(f"{key} must be positive, got {value}")
+    if not thickness >= 0:
+        raise ValueError(f"thickness must not be negative, got {thickness}")
+    return design
+
+
 def read_input_file(filename):
     with open(filename, "r") as f:
         lines = f.readlines()
@@ -285,8 +533,118 @@ def main():
         help="The fluid flowing through the channel (-).",
     )
 
+    # Optimize -----------------------------
+    optimize = subparser.add_parser(
+        "optimize",
+        help="Optimize channel geometry and fan choice for the case in an input file.",
+    )
+    optimize.add_argument(
+        "-f", "--filename", type=str, required=True, help="Name of the input file."
+    )
+    optimize.add_argument(
+        "--objective",
+        type=str,
+        default="fan-power",
+        choices=["fan-power", "noise", "area", "t-out"],
+        help="Quantity to minimize: fan power (W), fan noise (dBA), channel "
+        "cross-section (m^2) or outlet temperature (K).",
+    )
+    optimize.add_argument(
+        "--Tmax",
+        type=float,
+        required=True,
+        help="Maximum allowed temperature of the heated surface (K).",
+    )
+    optimize.add_argument(
+        "--width-bounds",
+        type=float,
+        nargs=2,
+        default=[0.01, 1.0],
+        metavar=("MIN", "MAX"),
+        help="Bounds on the width of the channel (m).",
+    )
+    optimize.add_argument(
+        "--height-bounds",
+        type=float,
+        nargs=2,
+        default=[0.005, 0.1],
+        metavar=("MIN", "MAX"),
+        help="Bounds on the height of the channel (m).",
+    )
+    optimize.add_argument(
+        "--fans",
+        type=str,
+        nargs="+",
+        help="Model numbers of the catalog fans to consider (default: all).",
+    )
+    optimize.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs).",
+    )
+
+    # Serve --------------------------------
+    serve = subparser.add_parser(
+        "serve", help="Run a local HTTP/JSON solve service that micro-batches requests."
+    )
+    serve.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind.")
+    serve.add_argument("--port", type=int, default=5001, help="Port to bind.")
+    serve.add_argument(
+        "--max-batch",
+        type=int,
+        default=256,
+        help="Maximum number of designs solved in one batch.",
+    )
+    serve.add_argument(
+        "--max-wait",
+        type=float,
+        default=0.005,
+        help="Time to wait for more requests before solving a batch (s).",
+    )
+    serve.add_argument(
+        "--max-pending",
+        type=int,
+        default=1024,
+        help="Maximum number of queued requests before new ones are rejected.",
+    )
+    serve.add_argument(
+        "--timeout", type=float, default=30.0, help="Per-request timeout (s)."
+    )
+
+    # Worker -------------------------------
+    worker = subparser.add_parser(
+        "worker",
+        help="Solve newline-delimited JSON jobs from stdin (or a Unix socket) in a "
+        "warm process, writing one JSON result line per job.",
+    )
+    worker.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help="Path of a Unix socket to serve instead of reading stdin.",
+    )
+    worker.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Number of worker processes."
+    )
+    worker.add_argument(
+        "--chunksize",
+        type=int,
+        default=1,
+        help="Jobs handed to a worker process at a time (with --jobs > 1).",
+    )
+    worker.add_argument(
+        "--fluids",
+        type=str,
+        nargs="+",
+        default=["air"],
+        help="Fluids to warm up before the first job. Cantera phases are loaded "
+        "at startup, JANAF lookups are cached as jobs run.",
+    )
+
     pargs = parser.parse_args()
-    if pargs.subparser == "inputfile":
+    if pargs.subparser in ("inputfile", "optimize"):
         w, h, l_in, l_chip, l_out, T_in, V_dot, q, fluid_name = read_input_file(
             pargs.filename
         )
@@ -306,6 +664,94 @@ def main():
     else:
         logging.basicConfig(level=logging.INFO)
 
+    if pargs.subparser == "worker":
+        from src.model.worker import JobRunner, run_socket, run_stream
+
+        # keep per-segment solver logs off stderr unless debugging
+        if not pargs.debug:
+            logging.getLogger().setLevel(logging.WARNING)
+        runner = JobRunner(
+            processes=pargs.jobs, fluids=pargs.fluids, chunksize=pargs.chunksize
+        )
+        try:
+            if pargs.socket:
+                try:
+                    run_socket(runner, pargs.socket)
+                except OSError as e:
+                    parser.error(str(e))
+            else:
+                run_stream(runner)
+                # end of input: let the pool finish the jobs it was given
+                runner.close()
+        except KeyboardInterrupt:
+            sys.exit(128 + signal.SIGINT)
+        finally:
+            # interrupted, or the server stopped: drop the jobs still queued
+            runner.terminate()
+        return
+
+    if pargs.subparser == "serve":
+        from src.model.service import serve
+
+        # per-segment solver and per-request logs skew the service's own metrics
+        if not pargs.debug:
+            logging.getLogger().setLevel(logging.WARNING)
+        serve(
+            pargs.host,
+            pargs.port,
+            pargs.max_batch,
+            pargs.max_wait,
+            pargs.max_pending,
+            pargs.timeout,
+        )
+        return
+
+    if pargs.subparser == "optimize":
+        from src.model.fan_catalog import read_fan_data
+        from src.model.optimize import optimize_design
+
+        for name, (lo, hi) in [
+            ("--width-bounds", pargs.width_bounds),
+            ("--height-bounds", pargs.height_bounds),
+        ]:
+            if lo <= 0 or lo > hi:
+                parser.error(f"{name} needs 0 < MIN <= MAX, got {lo} {hi}")
+        if pargs.fans:
+            missing = sorted(set(pargs.fans) - set(read_fan_data().index))
+            if missing:
+                parser.error(f"fans not in catalog: {', '.join(missing)}")
+
+        results = optimize_design(
+            objective=pargs.objective,
+            t_max=pargs.Tmax,
+            w_bounds=pargs.width_bounds,
+            h_bounds=pargs.height_bounds,
+            w0=w,
+            h0=h,
+            l_in=l_in,
+            l_chip=l_chip,
+            l_out=l_out,
+            t_in=T_in,
+            q=q,
+            fluid_name=fluid_name,
+            fans=pargs.fans,
+            max_workers=pargs.jobs,
+        )
+        logging.info(f"Candidate designs (best first):\n{results.to_string()}")
+        best = results.iloc[0]
+        if not best["feasible"]:
+            logging.warning(
+                f"No design keeps the heated surface below {pargs.Tmax:.02f}K"
+            )
+            return
+        logging.info(
+            f"Best design: fan {best.name}, width = {best['width']:.05f}m, "
+            f"height = {best['height']:.05f}m, "
+            f"heated surface = {best['t_chip']:.02f}K, "
+            f"{pargs.objective} = {best['objective']:.05g}"
+        )
+        return
+
     # SOLVE ================================
     t_chip, t_mid_chip, t_out = calculate_parameters(
         w, h, l_in, l_chip, l_out, T_in, V_dot, q, fluid_name
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import pandas as pd
+
+
+FAN_DATA_PATH = Path(__file__).parent / "../../data/model/fan_specifications_rack_fans.csv"
+
+
+def airflow_cfm_to_m3s(airflow_cfm):
+    return airflow_cfm * 0.00047194745
+
+
+def read_fan_data(filename=FAN_DATA_PATH):
+    """Reads the rack fan catalog and keeps only fans with a numeric airflow.
+
+    Inputs:
+        filename (str or Path): Path to the fan specification csv
+
+    Returns:
+        fan_data (pd.DataFrame): Catalog indexed by model number, with an added
+            "Airflow (m3/s)" column
+    """
+    # TODO clean data better
+    fan_data = pd.read_csv(filename, index_col=0)
+    fan_data = fan_data.loc[fan_data.index.dropna()]
+    airflow = pd.to_numeric(fan_data["Airflow (CFM)"], errors="coerce").dropna()
+    airflow = airflow_cfm_to_m3s(airflow)
+    fan_data = fan_data.loc[airflow.index]
+    fan_data["Airflow (m3/s)"] = airflow
+    return fan_data
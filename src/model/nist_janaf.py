@@ -1,8 +1,12 @@
 ## multiply cp by 1000
+from functools import lru_cache
+
 import pandas as pd
 import numpy as np
 
 
+# every lookup is a NIST webbook request, so repeated states are served from memory
+@lru_cache(maxsize=65_536)
 def get_fluid_properties_janaf(fluid_name, temp, pressure):
     """Description:
     This function takes in the name of a fluid, temperature, and pressure (default value = 101325 Pa)
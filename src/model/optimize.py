@@ -0,0 +1,224 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+from src.model.calculate_chip_temp import calculate_parameters
+from src.model.fan_catalog import read_fan_data
+
+
+# objective name -> fan catalog column, or None if it depends on the channel
+OBJECTIVES = {
+    "fan-power": "Power Consumption (W Watts)",
+    "noise": "Noise (dBA)",
+    "area": None,
+    "t-out": None,
+}
+
+
+@lru_cache(maxsize=4096)
+def _evaluate_cached(w, h, l_in, l_chip, l_out, t_in, v_dot, q, fluid_name):
+    return calculate_parameters(w, h, l_in, l_chip, l_out, t_in, v_dot, q, fluid_name)
+
+
+def evaluate_design(w, h, l_in, l_chip, l_out, t_in, v_dot, q, fluid_name):
+    """Memoized `calculate_parameters`.
+
+    The optimizer asks for the objective and the constraint at the same point,
+    and finite differences revisit points, so geometry is rounded to 1e-9 m
+    before it is used as a cache key.
+
+    Returns:
+        t_chip (float): Temperature of heated surface (K)
+        t_mid_chip (float): Temperature in the middle of the heated channel segment (K)
+        t_out (float): Temperature exiting the channel (K)
+    """
+    return _evaluate_cached(
+        round(float(w), 9),
+        round(float(h), 9),
+        l_in,
+        l_chip,
+        l_out,
+        t_in,
+        v_dot,
+        q,
+        fluid_name,
+    )
+
+
+def optimize_geometry(
+    v_dot,
+    t_max,
+    w_bounds,
+    h_bounds,
+    w0,
+    h0,
+    l_in,
+    l_chip,
+    l_out,
+    t_in,
+    q,
+    fluid_name,
+):
+    """Finds the smallest channel cross-section for a fixed flow rate subject to
+    `t_chip <= t_max`.
+
+    Only the cross-section area depends on the channel geometry: the outlet
+    temperature is set by the energy balance alone, and the fan objectives by the
+    catalog. The smallest feasible channel is therefore sought for every
+    objective, and `optimize_design` ranks the fans by the objective itself.
+
+    Inputs:
+        v_dot (float): Volume flow rate delivered by the fan (m^3/s)
+        t_max (float): Maximum allowed chip temperature (K)
+        w_bounds (tuple): Lower and upper bound of the width (m)
+        h_bounds (tuple): Lower and upper bound of the height (m)
+        w0 (float): Starting width (m)
+        h0 (float): Starting height (m)
+        l_in, l_chip, l_out, t_in, q, fluid_name: See `calculate_parameters`
+
+    Returns:
+        result (dict): Width, height, area, temperatures and feasibility
+    """
+    lower = np.array([w_bounds[0], h_bounds[0]], dtype=float)
+    span = np.array([w_bounds[1], h_bounds[1]], dtype=float) - lower
+    # a variable with equal bounds is fixed at that value
+    fixed = span == 0
+
+    # optimize on the unit square so both variables see the same step sizes
+    def to_geometry(x):
+        return lower + np.clip(x, 0, 1) * span
+
+    def evaluate(x):
+        w, h = to_geometry(x)
+        return evaluate_design(w, h, l_in, l_chip, l_out, t_in, v_dot, q, fluid_name)
+
+    def cost(x):
+        w, h = to_geometry(x)
+        return w * h / (w_bounds[1] * h_bounds[1])
+
+    def temperature_margin(x):
+        return (t_max - evaluate(x)[0]) / t_max
+
+    x0 = np.where(fixed, 0, (np.array([w0, h0]) - lower) / np.where(fixed, 1, span))
+    x0 = np.clip(x0, 0, 1)
+    res = minimize(
+        cost,
+        x0,
+        method="SLSQP",
+        bounds=[(0, 0) if f else (0, 1) for f in fixed],
+        constraints=[{"type": "ineq", "fun": temperature_margin}],
+        options={"maxiter": 100, "ftol": 1e-9, "eps": 1e-6},
+    )
+
+    w, h = to_geometry(res.x)
+    t_chip, t_mid_chip, t_out = evaluate(res.x)
+    logging.debug(f"v_dot={v_dot:.5f}: {res.message} after {res.nit} iterations")
+    return {
+        "width": w,
+        "height": h,
+        "area": w * h,
+        "t_chip": t_chip,
+        "t_out": t_out,
+        "feasible": t_chip <= t_max + 1e-6,
+    }
+
+
+def _optimize_fan(fan, **kwargs):
+    name, v_dot = fan
+    result = optimize_geometry(v_dot, **kwargs)
+    result["fan"] = name
+    result["v_dot"] = v_dot
+    return result
+
+
+def _init_worker(level):
+    logging.getLogger().setLevel(level)
+
+
+def optimize_design(
+    objective,
+    t_max,
+    w_bounds,
+    h_bounds,
+    w0,
+    h0,
+    l_in,
+    l_chip,
+    l_out,
+    t_in,
+    q,
+    fluid_name,
+    fans=None,
+    max_workers=None,
+):
+    """Searches the fan catalog and optimizes the channel geometry for every fan.
+
+    Each catalog fan fixes the flow rate, so the fan choice is an exhaustive
+    discrete search while width and height are found with SLSQP. Fans are
+    optimized in parallel in a process pool.
+
+    Inputs:
+        objective (str): One of `OBJECTIVES`
+        t_max (float): Maximum allowed chip temperature (K)
+        w_bounds, h_bounds, w0, h0: See `optimize_geometry`
+        l_in, l_chip, l_out, t_in, q, fluid_name: See `calculate_parameters`
+        fans (list, optional): Model numbers to consider. Default is the full catalog.
+        max_workers (int, optional): Size of the process pool. Default is the CPU count.
+
+    Returns:
+        results (pd.DataFrame): One row per fan, best design first. Infeasible fans
+            are sorted last.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(
+            f"Unknown objective '{objective}', expected one of {list(OBJECTIVES)}"
+        )
+
+    fan_data = read_fan_data()
+    if fans is not None:
+        missing = set(fans) - set(fan_data.index)
+        if missing:
+            raise ValueError(f"Fans not in catalog: {sorted(missing)}")
+        fan_data = fan_data.loc[list(fans)]
+    # duplicate model numbers share the same airflow
+    airflow = fan_data["Airflow (m3/s)"].groupby(level=0).first()
+
+    worker = partial(
+        _optimize_fan,
+        t_max=t_max,
+        w_bounds=w_bounds,
+        h_bounds=h_bounds,
+        w0=w0,
+        h0=h0,
+        l_in=l_in,
+        l_chip=l_chip,
+        l_out=l_out,
+        t_in=t_in,
+        q=q,
+        fluid_name=fluid_name,
+    )
+    # per-evaluation solver logs are only useful when debugging
+    worker_level = logging.getLogger().getEffectiveLevel()
+    if worker_level > logging.DEBUG:
+        worker_level = logging.WARNING
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker, initargs=(worker_level,)
+    ) as executor:
+        results = list(executor.map(worker, airflow.items()))
+
+    results = pd.DataFrame(results).set_index("fan")
+    column = OBJECTIVES[objective]
+    if column is None:
+        results["objective"] = results[objective.replace("-", "_")]
+    else:
+        values = pd.to_numeric(fan_data[column], errors="coerce")
+        results["objective"] = values.groupby(level=0).first()
+    results["objective"] = results["objective"].fillna(np.inf)
+
+    return results.sort_values(
+        ["feasible", "objective", "area"], ascending=[False, True, True]
+    )
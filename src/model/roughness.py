@@ -0,0 +1,50 @@
+import numpy as np
+
+
+# Surface roughness vs. coating thickness, both in mm. Linear fit of the sample
+# data the GUI used to generate on every call (roughness = 0.5 * thickness).
+THICKNESS_MM = np.linspace(0, 1, 101)
+ROUGHNESS_MM = 0.5 * THICKNESS_MM
+
+
+class RoughnessModel:
+    def __init__(self, thickness=THICKNESS_MM, roughness=ROUGHNESS_MM):
+        """Tabulated surface roughness vs. coating thickness.
+
+        The table is validated and stored once. Evaluation is linear
+        interpolation, so it is deterministic and works on scalars or arrays.
+
+        Inputs:
+            thickness (array): Coating thickness, strictly increasing (mm)
+            roughness (array): Absolute surface roughness at each thickness (mm)
+        """
+        thickness = np.asarray(thickness, dtype=float)
+        roughness = np.asarray(roughness, dtype=float)
+        if thickness.shape != roughness.shape or thickness.ndim != 1:
+            raise ValueError("thickness and roughness must be 1D arrays of equal size")
+        if np.any(np.diff(thickness) <= 0):
+            raise ValueError("thickness must be strictly increasing")
+        self.thickness = thickness
+        self.roughness = roughness
+
+    def __call__(self, thickness):
+        """Returns the absolute roughness (mm) for `thickness` (mm), clamped to the
+        ends of the table."""
+        return np.interp(thickness, self.thickness, self.roughness)
+
+    def absolute_roughness(self, thickness):
+        """Returns the absolute roughness (m) for `thickness` (mm)."""
+        return self(thickness) * 1e-3
+
+    def relative_roughness(self, thickness, diameter_h):
+        """Returns the roughness relative to the hydraulic diameter (-), as used by
+        the friction and Nusselt correlations in `Segment`.
+
+        Inputs:
+            thickness (float or array): Coating thickness (mm)
+            diameter_h (float or array): Hydraulic diameter of the channel (m)
+        """
+        return self.absolute_roughness(thickness) / diameter_h
+
+
+default_model = RoughnessModel()
@@ -0,0 +1,216 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+
+import cantera as ct
+import numpy as np
+from flask import Flask, jsonify, request
+
+from src.model.calculate_chip_temp import (
+    CANTERA_FLUIDS,
+    calculate_parameters_batch,
+    get_cantera_property_table,
+    parse_design,
+)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class MicroBatcher:
+    def __init__(self, max_batch=256, max_wait=0.005, max_pending=1024):
+        """Collects designs submitted from many threads into micro-batches and
+        solves each batch with one `calculate_parameters_batch` call.
+
+        All solving happens on a single background thread, so the cached Cantera
+        phase is never shared between threads.
+
+        Inputs:
+            max_batch (int): Maximum number of designs solved in one call
+            max_wait (float): Time to wait for more designs after the first one
+                of a batch arrives (s)
+            max_pending (int): Maximum number of queued designs before new ones
+                are rejected
+        """
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        # metrics
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._latencies = deque(maxlen=10_000)
+        self._counts = {
+            "requests": 0,
+            "completed": 0,
+            "rejected": 0,
+            "expired": 0,
+            "errors": 0,
+            "batches": 0,
+            "designs_solved": 0,
+        }
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def submit(self, design, timeout=None):
+        """Queues a design and returns a `Future` for its result.
+
+        Raises `QueueFull` if `max_pending` designs are already waiting. Designs
+        still queued after `timeout` seconds are dropped without being solved.
+        """
+        future = Future()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._count("requests")
+        try:
+            self._queue.put_nowait((design, future, time.monotonic(), deadline))
+        except queue.Full:
+            self._count("rejected")
+            raise QueueFull(f"{self._queue.maxsize} designs already pending")
+        return future
+
+    def solve(self, design, timeout=None):
+        """Submits a design and waits for `(t_chip, t_mid_chip, t_out)`."""
+        future = self.submit(design, timeout)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._counts)
+            latencies = np.array(self._latencies)
+        uptime = time.monotonic() - self._started
+        metrics["pending"] = self._queue.qsize()
+        metrics["uptime_s"] = uptime
+        metrics["throughput_per_s"] = metrics["completed"] / uptime
+        metrics["mean_batch_size"] = (
+            metrics["designs_solved"] / metrics["batches"] if metrics["batches"] else 0
+        )
+        if latencies.size:
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            metrics.update(latency_p50_s=p50, latency_p95_s=p95, latency_p99_s=p99)
+        return metrics
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counts[name] += n
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        window_end = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = window_end - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            now = time.monotonic()
+            live = []
+            for item in batch:
+                design, future, submitted, deadline = item
+                if not future.set_running_or_notify_cancel():
+                    # the caller already gave up
+                    self._count("expired")
+                    continue
+                if deadline is not None and now > deadline:
+                    self._count("expired")
+                    future.set_exception(TimeoutError("Expired before it was solved"))
+                else:
+                    live.append(item)
+            if live:
+                self._solve(live)
+
+    def _solve(self, batch):
+        designs = [design for design, *_ in batch]
+        try:
+            # errors of single designs come back in their slots
+            results = calculate_parameters_batch(designs)
+        except Exception as e:
+            logging.exception("Batch solve failed")
+            results = [e] * len(designs)
+        self._count("batches")
+        self._count("designs_solved", len(designs))
+
+        done = time.monotonic()
+        for (design, future, submitted, deadline), result in zip(batch, results):
+            if isinstance(result, Exception):
+                self._count("errors")
+                future.set_exception(result)
+            else:
+                self._count("completed")
+                future.set_result(result)
+            with self._lock:
+                self._latencies.append(done - submitted)
+
+
+def create_app(batcher, timeout=30.0):
+    """Creates the Flask app serving `batcher`.
+
+    Routes:
+        POST /solve: JSON design with `DESIGN_KEYS`, returns the temperatures (K)
+        GET /metrics: Throughput, latency and queue metrics of the batcher
+    """
+    app = Flask(__name__)
+
+    @app.route("/solve", methods=["POST"])
+    def solve():
+        try:
+            design = parse_design(request.get_json(force=True))
+        except (TypeError, ValueError) as e:
+            return jsonify(error=str(e)), 400
+        try:
+            t_chip, t_mid_chip, t_out = batcher.solve(design, timeout)
+        except QueueFull as e:
+            return jsonify(error=str(e)), 503
+        except TimeoutError:
+            return jsonify(error=f"Not solved within {timeout}s"), 504
+        except (ValueError, ZeroDivisionError, ct.CanteraError) as e:
+            # well-formed design the model cannot solve
+            return jsonify(error=str(e)), 400
+        except Exception as e:
+            return jsonify(error=str(e)), 500
+        return jsonify(t_chip=t_chip, t_mid_chip=t_mid_chip, t_out=t_out)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return jsonify(batcher.metrics())
+
+    return app
+
+
+def serve(host, port, max_batch, max_wait, max_pending, timeout):
+    # build the property tables before the first vectorized batch needs them
+    for fluid_name in CANTERA_FLUIDS:
+        get_cantera_property_table(fluid_name)
+    batcher = MicroBatcher(max_batch, max_wait, max_pending).start()
+    app = create_app(batcher, timeout)
+    # werkzeug logs every request at INFO unless told otherwise
+    logging.getLogger("werkzeug").setLevel(logging.getLogger().getEffectiveLevel())
+    logging.warning(f"Serving on http://{host}:{port}")
+    try:
+        app.run(host=host, port=port, threaded=True)
+    finally:
+        batcher.stop()
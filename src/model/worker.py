@@ -0,0 +1,189 @@
+import errno
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from functools import lru_cache
+
+from src.model.calculate_chip_temp import (
+    CANTERA_FLUIDS,
+    calculate_parameters,
+    get_cantera_solution,
+    parse_design,
+)
+
+
+@lru_cache(maxsize=65_536)
+def _solve_cached(design):
+    return calculate_parameters(*design)
+
+
+def run_job(line):
+    """Solves one newline-delimited JSON job and returns its JSON result line.
+
+    A job is a JSON object with the keys of `DESIGN_KEYS` and an optional "id",
+    which is echoed back. Failures are reported as an "error" field so one bad job
+    does not stop the stream.
+    """
+    job_id = None
+    try:
+        job = json.loads(line)
+        job_id = job.get("id")
+        t_chip, t_mid_chip, t_out = _solve_cached(parse_design(job))
+        result = {"t_chip": t_chip, "t_mid_chip": t_mid_chip, "t_out": t_out}
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    return json.dumps({"id": job_id, **result})
+
+
+def _init_worker(level, fluids):
+    logging.getLogger().setLevel(level)
+    # load the Cantera phases before the first job arrives; JANAF properties are
+    # cached per (fluid, T, P) by `get_fluid_properties_janaf` as jobs run
+    for fluid_name in fluids:
+        if fluid_name in CANTERA_FLUIDS:
+            get_cantera_solution(fluid_name)
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def _init_pool_worker(level, fluids):
+    # the parent handles Ctrl-C and stops the pool. SIGTERM, from the parent or
+    # sent to the whole process group, exits through SystemExit rather than
+    # killing the process outright, so a worker waiting for a task releases the
+    # lock of the shared task queue on its way out
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    _init_worker(level, fluids)
+
+
+class JobRunner:
+    def __init__(self, processes=1, fluids=("air",), chunksize=1):
+        """Keeps the model warm and solves streams of job lines.
+
+        With one process, jobs are solved in this process, one at a time. With
+        more, they are distributed over a process pool sharing one task queue,
+        and results are returned in input order.
+
+        Inputs:
+            processes (int): Number of worker processes
+            fluids (tuple): Fluids to warm up. Cantera phases are loaded at
+                startup.
+            chunksize (int): Jobs handed to a pool worker at a time. Larger
+                values cut overhead, but a chunk waits until it is full or the
+                input ends.
+        """
+        self.chunksize = chunksize
+        self._lock = threading.Lock()
+        level = logging.getLogger().getEffectiveLevel()
+        if processes > 1:
+            self._pool = multiprocessing.Pool(
+                processes, initializer=_init_pool_worker, initargs=(level, fluids)
+            )
+        else:
+            self._pool = None
+            _init_worker(level, fluids)
+
+    def run(self, lines):
+        """Yields one JSON result line per non-blank input line."""
+        lines = (line for line in lines if line.strip())
+        if self._pool is not None:
+            yield from self._pool.imap(run_job, lines, self.chunksize)
+        else:
+            for line in lines:
+                # the cached Cantera phase is not safe to share between threads
+                with self._lock:
+                    result = run_job(line)
+                yield result
+
+    def close(self):
+        """Waits for the pool to finish the jobs it was given. Use at the end of
+        the input."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+
+    def terminate(self):
+        """Stops the pool without solving the jobs still queued. Use when
+        interrupted."""
+        if self._pool is not None:
+            # a second Ctrl-C must not leave the pool half stopped
+            previous = signal.signal(signal.SIGINT, signal.SIG_IGN)
+            try:
+                self._pool.terminate()
+                self._pool.join()
+            finally:
+                signal.signal(signal.SIGINT, previous)
+
+
+def run_stream(runner, infile=sys.stdin, outfile=sys.stdout):
+    """Solves job lines from `infile` and writes result lines to `outfile` until
+    the input ends.
+
+    SIGTERM exits like Ctrl-C does, so the caller can stop the pool.
+    """
+    previous = signal.signal(signal.SIGTERM, _exit_on_signal)
+    try:
+        for result in runner.run(infile):
+            outfile.write(result + "\n")
+            outfile.flush()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def _remove_stale_socket(path):
+    """Removes a socket file left behind by a worker that was killed, but refuses
+    to take over a path another worker is still listening on."""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    with socket.socket(socket.AF_UNIX) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise OSError(errno.EADDRINUSE, f"Another worker is listening on {path}")
+
+
+def run_socket(runner, path):
+    """Serves `runner` on a Unix socket. Each connection streams job lines and
+    receives result lines, and connections are handled concurrently.
+
+    SIGTERM stops the server like Ctrl-C does, so the socket file is removed.
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            lines = (line.decode() for line in self.rfile)
+            for result in runner.run(lines):
+                self.wfile.write((result + "\n").encode())
+                self.wfile.flush()
+
+    _remove_stale_socket(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        # don't wait for open connections on shutdown
+        server.daemon_threads = True
+
+        def stop(signum, frame):
+            # shutdown() blocks until serve_forever() returns, which runs here
+            threading.Thread(target=server.shutdown).start()
+
+        previous = signal.signal(signal.SIGTERM, stop)
+        logging.warning(f"Listening on {path}")
+        try:
+            server.serve_forever()
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            os.unlink(path)